@@ -1,6 +1,12 @@
+import logging
 import os
 import sys
 
+# Lowercased image file extensions that make a same-named .MOV redundant
+IMAGE_EXTS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.heic'})
+
+log = logging.getLogger(__name__)
+
 def remove_duplicate_mov_files(directory):
     """
     Remove .MOV files if an image with the same base name exists in the directory.
@@ -11,73 +17,74 @@ def remove_duplicate_mov_files(directory):
     Returns:
         tuple: (removed_count, skipped_count)
     """
-    # Define common image extensions
-    image_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.heic']
-    
-    # Get all files in the directory
-    all_files = os.listdir(directory)
-    
-    # Create a dictionary to store base names of image files
+    # Base names of image files; only these and the .MOV candidates are kept
+    # in memory, never the full directory listing
     image_base_names = set()
     
-    # First pass: collect all image base names
-    for filename in all_files:
-        file_path = os.path.join(directory, filename)
-        
-        # Skip directories
-        if os.path.isdir(file_path):
-            continue
-        
-        # Get file extension in lowercase
-        _, ext = os.path.splitext(filename)
-        ext = ext.lower()
-        
-        # If it's an image file, add its base name to the set
-        if ext in image_extensions:
-            base_name = os.path.splitext(filename)[0]
-            image_base_names.add(base_name)
+    # .MOV files seen while scanning, checked once all image names are known
+    mov_candidates = []
+    
+    # First pass: stream the directory, collecting image base names and .MOV candidates
+    with os.scandir(directory) as it:
+        for entry in it:
+            # Skip directories
+            if entry.is_dir(follow_symlinks=False):
+                continue
+            
+            # Split off the base name and the lowercase file extension in one
+            # call, treating leading dots the way os.path.splitext does
+            base_name, dot, ext = entry.name.rpartition('.')
+            if not dot or not base_name.lstrip('.'):
+                continue
+            ext = '.' + ext.lower()
+            
+            # If it's an image file, add its base name to the set
+            if ext in IMAGE_EXTS:
+                image_base_names.add(base_name)
+            elif ext == '.mov':
+                mov_candidates.append((entry.inode(), base_name, entry.path, entry.name))
     
-    # Second pass: remove .MOV files with matching base names
+    # Second pass: remove .MOV candidates with matching base names
     removed_count = 0
     skipped_count = 0
     
-    for filename in all_files:
-        file_path = os.path.join(directory, filename)
-        
-        # Skip directories
-        if os.path.isdir(file_path):
-            continue
-        
-        # Get file extension in lowercase
-        _, ext = os.path.splitext(filename)
-        ext = ext.lower()
-        
-        # If it's a .MOV file, check if there's a matching image
-        if ext == '.mov':
-            base_name = os.path.splitext(filename)[0]
-            
-            if base_name in image_base_names:
-                try:
-                    # Remove the .MOV file
-                    os.remove(file_path)
-                    print(f"Removed: {filename}")
-                    removed_count += 1
-                except Exception as e:
-                    print(f"Error removing {filename}: {str(e)}")
-                    skipped_count += 1
-            else:
-                print(f"Kept: {filename} (no matching image found)")
+    # Remove candidates one at a time in inode order so the unlinks walk the
+    # inode table sequentially; the inode comes from the directory entry, not a stat
+    for _, base_name, file_path, filename in sorted(mov_candidates):
+        if base_name in image_base_names:
+            try:
+                # Remove the .MOV file
+                os.remove(file_path)
+                log.info("Removed: %s", filename)
+                removed_count += 1
+            except Exception as e:
+                log.error("Error removing %s: %s", filename, e)
                 skipped_count += 1
+        else:
+            log.info("Kept: %s (no matching image found)", filename)
+            skipped_count += 1
     
     return removed_count, skipped_count
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python remove_duplicate_mov.py <directory>")
+    args = sys.argv[1:]
+    quiet = '--quiet' in args
+    if quiet:
+        args.remove('--quiet')
+    
+    if len(args) != 1:
+        print("Usage: python remove_duplicate_mov.py [--quiet] <directory>")
         print("Example: python remove_duplicate_mov.py ./my_photos")
         sys.exit(1)
     
-    directory = sys.argv[1]
+    directory = args[0]
+    
+    # Per-file messages go through logging; --quiet drops them
+    logging.basicConfig(
+        stream=sys.stdout,
+        format="%(message)s",
+        level=logging.WARNING if quiet else logging.INFO,
+    )
     
     if not os.path.isdir(directory):
         print(f"Error: {directory} is not a valid directory")
@@ -1,16 +1,135 @@
+import errno
+import logging
 import os
+import re
 import shutil
+import sys
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image, UnidentifiedImageError
 import piexif
 import hachoir.parser
 import hachoir.metadata
 
+# The script also runs under PyPy (pypy3 sort.py ...), where C extensions go
+# through the slow cpyext layer; there the pure-Python piexif and hachoir
+# readers stay on the hot path and PIL is only a fallback
+if '__pypy__' in sys.builtin_module_names:
+    pyexiv2 = None
+else:
+    try:
+        import pyexiv2
+    except ImportError:  # optional, see the "exiv2" extra
+        pyexiv2 = None
+    else:
+        # Unreadable metadata already falls through to the other readers
+        pyexiv2.set_log_level(4)
+
+# Lowercased file extensions handled by get_media_date_taken
+IMAGE_EXTS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.heic'})
+VIDEO_EXTS = frozenset({'.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv', '.webm'})
+
+# Local date and time embedded in camera filenames, e.g. IMG_20230514_143022.jpg;
+# Pixel PXL_ names carry UTC instead, so those are left to the metadata readers
+_FNAME_DT = re.compile(r'(?<!\d)(?<!PXL_)(20\d{2})[-_]?(\d{2})[-_]?(\d{2})[-_ ]?(\d{2})(\d{2})(\d{2})')
+
+log = logging.getLogger(__name__)
+
+def _parse_exif_dt(date_taken):
+    """Parse a fixed-width EXIF "YYYY:MM:DD HH:MM:SS" str or bytes, or return None."""
+    try:
+        return datetime.datetime(
+            int(date_taken[0:4]), int(date_taken[5:7]), int(date_taken[8:10]),
+            int(date_taken[11:13]), int(date_taken[14:16]), int(date_taken[17:19]),
+        )
+    except (ValueError, TypeError):
+        return None
+
+def _read_jpeg_exif(file_path):
+    """Return a JPEG's raw APP1 EXIF block, b"" if it has none, or None if not a JPEG."""
+    with open(file_path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+            
+        # Walk the segment headers up to the start of the image data, seeking
+        # past every segment except the EXIF one
+        while True:
+            header = f.read(4)
+            if len(header) < 2 or header[0] != 0xFF:
+                return None
+            marker = header[1]
+            if marker in (0xDA, 0xD9):  # start of scan / end of image
+                return b""
+            if len(header) < 4:
+                return None
+            length = int.from_bytes(header[2:4], 'big')
+            if length < 2:
+                return None
+            if marker == 0xE1:
+                signature = f.read(6)
+                if signature == b'Exif\x00\x00':
+                    return signature + f.read(length - 8)
+                f.seek(length - 2 - len(signature), os.SEEK_CUR)
+            else:
+                f.seek(length - 2, os.SEEK_CUR)
+
+def _parse_filename_dt(filename):
+    """Parse a date and time embedded in a filename, or return None."""
+    match = _FNAME_DT.search(filename)
+    if not match:
+        return None
+    try:
+        return datetime.datetime(*map(int, match.groups()))
+    except ValueError:
+        return None
+
 def get_image_date_taken(file_path):
     """Extract date taken from image EXIF data."""
+    # libexiv2 parses the EXIF block in native code, so prefer it when installed
+    if pyexiv2 is not None:
+        try:
+            with pyexiv2.Image(file_path) as image:
+                exif = image.read_exif()
+        except Exception:
+            exif = None
+            
+        if exif is not None:
+            # Check for DateTimeOriginal or DateTime
+            date_taken = exif.get('Exif.Photo.DateTimeOriginal') or exif.get('Exif.Image.DateTime')
+            if not date_taken:
+                return None
+            return _parse_exif_dt(date_taken)
+            
+    # piexif only needs the EXIF segment, so try it before opening the whole
+    # image with PIL; JPEGs hand it just that block
     try:
-        image = Image.open(file_path)
-        exif_data = image._getexif()
+        exif_block = _read_jpeg_exif(file_path)
+        if exif_block == b"":
+            return None
+        exif_dict = piexif.load(exif_block or file_path)
+    except Exception:
+        exif_dict = None
+        
+    if exif_dict is not None:
+        exif = exif_dict.get('Exif', {})
+        
+        # Check for DateTimeOriginal (36867) or DateTime (306)
+        date_taken = None
+        if 36867 in exif:
+            date_taken = exif[36867]
+        elif 306 in exif_dict.get('0th', {}):
+            date_taken = exif_dict['0th'][306]
+            
+        if not date_taken:
+            return None
+            
+        # int() accepts the ASCII digits directly, no need to decode first
+        return _parse_exif_dt(date_taken)
+            
+    # Fall back to PIL for formats piexif can't handle
+    try:
+        with Image.open(file_path) as image:
+            exif_data = image._getexif()
         
         if not exif_data:
             return None
@@ -25,32 +144,10 @@ def get_image_date_taken(file_path):
                 return None
                 
         # Convert the date string to datetime object
-        try:
-            # Format: "YYYY:MM:DD HH:MM:SS"
-            dt = datetime.datetime.strptime(date_taken, "%Y:%m:%d %H:%M:%S")
-            return dt
-        except (ValueError, TypeError):
-            return None
+        return _parse_exif_dt(date_taken)
             
     except (UnidentifiedImageError, AttributeError, KeyError, OSError):
-        # Try using piexif for non-standard image formats
-        try:
-            exif_dict = piexif.load(file_path)
-            exif = exif_dict.get('Exif', {})
-            
-            # Check for DateTimeOriginal (36867) or DateTime (306)
-            date_taken = None
-            if 36867 in exif:
-                date_taken = exif[36867].decode('utf-8')
-            elif 306 in exif_dict.get('0th', {}):
-                date_taken = exif_dict['0th'][306].decode('utf-8')
-                
-            if date_taken:
-                return datetime.datetime.strptime(date_taken, "%Y:%m:%d %H:%M:%S")
-            return None
-            
-        except Exception:
-            return None
+        return None
 
 def get_video_date_taken(file_path):
     """Extract date taken from video metadata."""
@@ -75,19 +172,24 @@ def get_video_date_taken(file_path):
     except Exception:
         return None
 
-def get_media_date_taken(file_path):
-    """Determine if file is image or video and extract date taken."""
-    lower_path = file_path.lower()
+# Date extractor for each supported lowercased file extension
+_DISPATCH = (
+    {ext: get_image_date_taken for ext in IMAGE_EXTS}
+    | {ext: get_video_date_taken for ext in VIDEO_EXTS}
+)
+
+def get_media_date_taken(file_path, ext=None):
+    """Determine if file is image or video (by lowercased ext) and extract date taken."""
+    if ext is None:
+        ext = os.path.splitext(file_path)[1].lower()
     
-    # Image file extensions
-    if any(lower_path.endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp']):
-        return get_image_date_taken(file_path)
-        
-    # Video file extensions
-    elif any(lower_path.endswith(ext) for ext in ['.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv', '.webm']):
-        return get_video_date_taken(file_path)
+    handler = _DISPATCH.get(ext)
+    if not handler:
+        return None
         
-    return None
+    # Many cameras already put the date in the filename; only read the
+    # file's metadata when it doesn't
+    return _parse_filename_dt(os.path.basename(file_path)) or handler(file_path)
 
 def format_filename(dt):
     """Format datetime to a filename-friendly string."""
@@ -97,50 +199,72 @@ def process_directory(source_dir, target_subdir="dated_media"):
     """Process all media files in source directory."""
     # Create target subdirectory if it doesn't exist
     target_dir = os.path.join(source_dir, target_subdir)
-    if not os.path.exists(target_dir):
-        os.makedirs(target_dir)
+    os.makedirs(target_dir, exist_ok=True)
         
     # Statistics
     files_processed = 0
     files_moved = 0
     files_without_date = 0
     
-    # Process each file in the directory
-    for filename in os.listdir(source_dir):
-        source_path = os.path.join(source_dir, filename)
-        
-        # Skip directories and the target subdirectory
-        if os.path.isdir(source_path) or filename == target_subdir:
-            continue
+    # Collect the files to process
+    media_files = []
+    with os.scandir(source_dir) as it:
+        for entry in it:
+            # Only regular files; this also skips the target subdirectory,
+            # however target_subdir was spelled
+            if not entry.is_file(follow_symlinks=False):
+                continue
             
-        files_processed += 1
-        print(f"Processing {filename}...")
-        
-        # Extract date taken
-        date_taken = get_media_date_taken(source_path)
-        
-        if date_taken:
             # Get file extension
-            _, ext = os.path.splitext(filename)
-            
-            # Create new filename based on date taken
-            new_filename = format_filename(date_taken) + ext.lower()
-            target_path = os.path.join(target_dir, new_filename)
+            ext = os.path.splitext(entry.name)[1].lower()
+            media_files.append((entry.name, entry.path, ext))
+    
+    # Names already used in the target directory, kept up to date as files
+    # are moved so conflicts are resolved without probing the filesystem;
+    # casefolded because macOS and Windows filesystems ignore case
+    with os.scandir(target_dir) as it:
+        taken_names = {entry.name.casefold() for entry in it}
+    
+    # Extract dates taken concurrently; moves below stay on this thread so
+    # the filename conflict handling cannot race
+    with ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2) as pool:
+        dates_taken = pool.map(
+            get_media_date_taken,
+            [source_path for _, source_path, _ in media_files],
+            [ext for _, _, ext in media_files],
+        )
+        
+        # Process each file in the directory
+        for (filename, source_path, ext), date_taken in zip(media_files, dates_taken):
+            files_processed += 1
+            log.info("Processing %s...", filename)
             
-            # Handle filename conflicts
-            counter = 1
-            while os.path.exists(target_path):
-                new_filename = f"{format_filename(date_taken)}_{counter}{ext.lower()}"
-                target_path = os.path.join(target_dir, new_filename)
-                counter += 1
+            if date_taken:
+                # Create new filename based on date taken
+                base_name = format_filename(date_taken)
+                new_filename = base_name + ext
                 
-            # Move and rename the file
-            shutil.move(source_path, target_path)
-            print(f"Moved {filename} to {new_filename}")
-            files_moved += 1
-        else:
-            print(f"No date taken found for {filename}, leaving in place")
-            files_without_date += 1
+                # Handle filename conflicts
+                counter = 1
+                while new_filename.casefold() in taken_names:
+                    new_filename = f"{base_name}_{counter}{ext}"
+                    counter += 1
+                taken_names.add(new_filename.casefold())
+                target_path = os.path.join(target_dir, new_filename)
+                    
+                # Move and rename the file; the target lives under source_dir so
+                # a plain rename works unless it is a mount point
+                try:
+                    os.replace(source_path, target_path)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.move(source_path, target_path)
+                log.info("Moved %s to %s", filename, new_filename)
+                files_moved += 1
+            else:
+                log.info("No date taken found for %s, leaving in place", filename)
+                files_without_date += 1
     
     # Print summary
     print("\nSummary:")
@@ -149,12 +273,22 @@ def process_directory(source_dir, target_subdir="dated_media"):
     print(f"Files without date metadata: {files_without_date}")
 
 if __name__ == "__main__":
-    import sys
+    args = sys.argv[1:]
+    quiet = '--quiet' in args
+    if quiet:
+        args.remove('--quiet')
     
-    if len(sys.argv) > 1:
-        source_directory = sys.argv[1]
-        target_subdirectory = sys.argv[2] if len(sys.argv) > 2 else "dated_media"
+    if args:
+        # Per-file messages go through logging; --quiet drops them
+        logging.basicConfig(
+            stream=sys.stdout,
+            format="%(message)s",
+            level=logging.WARNING if quiet else logging.INFO,
+        )
+        
+        source_directory = args[0]
+        target_subdirectory = args[1] if len(args) > 1 else "dated_media"
         process_directory(source_directory, target_subdirectory)
     else:
-        print("Usage: python script.py <source_directory> [target_subdirectory]")
+        print("Usage: python script.py [--quiet] <source_directory> [target_subdirectory]")
         print("Example: python script.py ./my_photos dated_photos")